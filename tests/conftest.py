@@ -0,0 +1,15 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+SCRIPT = Path(__file__).resolve().parent.parent / "wifi-monitor.py"
+
+
+@pytest.fixture(scope="session")
+def wm():
+    # The script's file name is not importable as a module, load it by path
+    spec = importlib.util.spec_from_file_location("wifi_monitor", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,46 @@
+import numpy as np
+
+
+def _fill(ring, samples):
+    for i, (hour, download, upload) in enumerate(samples):
+        ring.add(i, hour, download, upload, float('nan'))
+
+
+def test_stats_match_numpy_after_eviction(wm):
+    rng = np.random.default_rng(0)
+    window = 50
+    # High-variance samples first, then near-constant ones, so the evicted
+    # samples dominate the variance of what is left
+    samples = [
+        (int(h), int(d), int(u))
+        for h, d, u in zip(
+            rng.integers(0, 3, 200),
+            rng.integers(1_000_000, 1_000_000_000, 200),
+            rng.integers(1_000_000, 500_000_000, 200),
+        )
+    ]
+    samples += [(i % 3, 50_000_000 + i % 2, 10_000_000 + i % 3) for i in range(300)]
+
+    ring = wm.SpeedRing(window=window, initial=8)
+    _fill(ring, samples)
+
+    assert len(ring) == window
+    retained = samples[-window:]
+    for hour in range(3):
+        downloads = np.array([d for h, d, _ in retained if h == hour], dtype=float)
+        uploads = np.array([u for h, _, u in retained if h == hour], dtype=float)
+        stats = ring.stats(hour)
+        assert stats['count'] == len(downloads)
+        np.testing.assert_allclose(stats['download_mean'], downloads.mean())
+        np.testing.assert_allclose(stats['download_std'], np.std(downloads, ddof=1))
+        np.testing.assert_allclose(stats['upload_mean'], uploads.mean())
+        np.testing.assert_allclose(stats['upload_std'], np.std(uploads, ddof=1))
+
+
+def test_hour_without_retained_samples_is_empty(wm):
+    ring = wm.SpeedRing(window=4, initial=4)
+    _fill(ring, [(1, 10, 10)] + [(2, 20, 20)] * 4)
+
+    assert ring.stats(1) is None
+    assert ring.hours() == [2]
+    assert ring.stats(2)['download_std'] == 0.0
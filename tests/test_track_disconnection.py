@@ -0,0 +1,102 @@
+import asyncio
+import socket
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+import pytest
+
+
+def _monitor(wm):
+    monitor = object.__new__(wm.WiFiMonitor)
+    monitor.disconnections = deque()
+    monitor._disconnection_count = 0
+    monitor._total_downtime = timedelta()
+    return monitor
+
+
+@pytest.mark.skipif(not hasattr(socket, 'AF_NETLINK'), reason="needs AF_NETLINK (Linux)")
+def test_open_netlink_inside_running_loop(wm):
+    async def main():
+        return wm.WiFiMonitor._open_netlink()
+
+    sock = asyncio.run(main())
+    if sock is None:
+        pytest.skip("rtnetlink socket not permitted here")
+    try:
+        assert sock.family == socket.AF_NETLINK
+        assert not sock.getblocking()
+    finally:
+        sock.close()
+
+
+def test_netlink_event_wakes_reconnect_before_backoff(wm, monkeypatch):
+    # The test plays the kernel on the peer end of a socketpair
+    sock, kernel = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    sock.setblocking(False)
+    monkeypatch.setattr(wm.WiFiMonitor, '_open_netlink', staticmethod(lambda: sock))
+    monitor = _monitor(wm)
+    probes = []
+    link_up = False
+
+    async def check_connection():
+        probes.append(time.monotonic())
+        return link_up
+
+    monitor.check_connection = check_connection
+
+    async def kernel_reports_link_up():
+        nonlocal link_up
+        await asyncio.sleep(0.1)
+        link_up = True
+        for _ in range(5):  # a burst of notifications
+            kernel.send(b'RTM_NEWROUTE')
+
+    async def main():
+        start = time.monotonic()
+        await asyncio.gather(
+            monitor.track_disconnection(datetime.now()),
+            kernel_reports_link_up()
+        )
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(main())
+    kernel.close()
+
+    assert elapsed < wm.RECONNECT_BACKOFF_MIN
+    assert len(probes) == 2
+    assert sock.fileno() == -1  # closed
+    assert monitor._disconnection_count == 1
+
+
+def test_falls_back_to_backoff_without_netlink(wm, monkeypatch):
+    monkeypatch.setattr(wm.WiFiMonitor, '_open_netlink', staticmethod(lambda: None))
+    monkeypatch.setattr(wm, 'RECONNECT_BACKOFF_MIN', 0.01)
+    monitor = _monitor(wm)
+    results = iter([False, False, True])
+
+    async def check_connection():
+        return next(results)
+
+    monitor.check_connection = check_connection
+    asyncio.run(monitor.track_disconnection(datetime.now()))
+
+    assert monitor._disconnection_count == 1
+
+
+def test_drain_empties_socket_without_blocking(wm):
+    sock, kernel = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    sock.setblocking(False)
+    for _ in range(3):
+        kernel.send(b'RTM_NEWLINK')
+
+    async def main():
+        event = asyncio.Event()
+        wm.WiFiMonitor._drain_netlink(sock.fileno(), event)
+        return event.is_set()
+
+    assert asyncio.run(main())
+    with pytest.raises(BlockingIOError):
+        sock.recv(1)
+    sock.close()
+    kernel.close()
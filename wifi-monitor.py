@@ -1,103 +1,577 @@
-import speedtest
+import asyncio
+import atexit
+import gc
+import httpx
 import time
 from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import csv
 from pathlib import Path
+import io
 import logging
+import logging.handlers
+import math
+import os
+import queue
 import socket
-from statistics import mean, stdev
-from collections import defaultdict
+from statistics import mean
+from collections import defaultdict, deque
 
-class WiFiMonitor:
-    def __init__(self):
-        self.speeds = []
-        self.disconnections = []
-        self.hourly_averages = {}
-        self.current_hour = datetime.now().hour
-        self.speed_extremes = {
-            'max_download': {'speed': 0, 'timestamp': None},
-            'min_download': {'speed': float('inf'), 'timestamp': None},
-            'max_upload': {'speed': 0, 'timestamp': None},
-            'min_upload': {'speed': float('inf'), 'timestamp': None}
+try:
+    import h2  # noqa: F401, enables HTTP/2 in httpx
+    HTTP2 = True
+except ImportError:  # httpx falls back to HTTP/1.1
+    HTTP2 = False
+
+DOWNLOAD_BYTES = 100 * 1024 * 1024  # 100 MiB
+UPLOAD_BYTES = 25 * 1024 * 1024  # 25 MiB
+UPLOAD_BLOCK = 1 << 20
+CLOUDFLARE_DOWN_URL = "https://speed.cloudflare.com/__down"
+CLOUDFLARE_UP_URL = "https://speed.cloudflare.com/__up"
+PING_HOST = ("8.8.8.8", 53)
+PING_INTERVAL = 1 / 20  # 20 Hz
+IDLE_PINGS = 5
+NS_PER_S = 1_000_000_000
+BPS_PER_MBPS = 1_000_000
+SAMPLE_INTERVAL_NS = 60 * NS_PER_S  # time between measurements
+PROBE_HOSTS = (("8.8.8.8", 53), ("1.1.1.1", 53))
+PROBE_TIMEOUT = 0.5
+RECONNECT_BACKOFF_MIN = 1  # seconds
+RECONNECT_BACKOFF_MAX = 30
+# rtnetlink multicast groups (linux/rtnetlink.h) woken on during a disconnection
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV4_ROUTE = 0x40
+
+SPEED_DTYPE = np.dtype([
+    ('ts', 'i8'),  # epoch nanoseconds
+    ('hour', 'i1'),
+    ('down_bps', 'i8'),  # raw bits per second, converted to Mbps only for output
+    ('up_bps', 'i8'),
+    ('loaded_lat', 'f4')  # mean latency while the transfers ran, ms
+])
+
+WINDOW_SAMPLES = 14 * 24 * 60  # two weeks of minute samples kept in memory
+MAX_DISCONNECTIONS = 1000  # most recent disconnections kept for the detailed report
+
+# Parquet dataset directory, one self-contained file per flushed batch so a
+# killed process loses at most the unflushed samples and runs never overwrite
+HISTORY_DIR = 'speeds'
+FLUSH_EVERY = 60  # samples per Parquet file
+HISTORY_SCHEMA = pa.schema([
+    ('ts', pa.timestamp('ns')),
+    ('hour', pa.int8()),
+    ('down_bps', pa.int64()),
+    ('up_bps', pa.int64()),
+    ('loaded_lat', pa.float32())
+])
+
+# Section headers are built once at import and shared by the report templates
+BAR = "=" * 30
+HDR_REPORT = f"{BAR} WiFi Monitoring Report {BAR}"
+HDR_EXTREMES = f"{BAR} Speed Extremes {BAR}"
+HDR_SUMMARY = f"{BAR} Connection Summary {BAR}"
+HDR_DISCONNECTIONS = f"{BAR} Detailed Disconnections {BAR}"
+HDR_PATTERNS = f"{BAR} Speed Patterns {BAR}"
+HDR_HOURLY = f"{BAR} Hourly Speed Averages {BAR}"
+
+NO_DISCONNECTIONS = "No disconnections recorded\n\n"
+
+REPORT_TEMPLATE = f"""\
+{HDR_REPORT}
+Report generated at: {{generated_at}}
+
+{HDR_EXTREMES}
+Maximum Download: {{max_dl:.2f}} Mbps at {{max_dl_ts}}
+Minimum Download: {{min_dl:.2f}} Mbps at {{min_dl_ts}}
+Maximum Upload: {{max_up:.2f}} Mbps at {{max_up_ts}}
+Minimum Upload: {{min_up:.2f}} Mbps at {{min_up_ts}}
+
+{HDR_SUMMARY}
+Total Disconnection Time: {{total_downtime}}
+Number of Disconnections: {{disconnections}}
+
+{HDR_DISCONNECTIONS}
+"""
+
+DISCONNECTION_TEMPLATE = """\
+Disconnected at: {start}
+Reconnected at: {end}
+Duration: {duration_s:.0f} s
+
+"""
+
+PATTERNS_TEMPLATE = f"""\
+{HDR_PATTERNS}
+Peak Download Speed Hour: {{peak_download:02d}}:00
+Peak Upload Speed Hour: {{peak_upload:02d}}:00
+Lowest Download Speed Hour: {{low_download:02d}}:00
+Lowest Upload Speed Hour: {{low_upload:02d}}:00
+
+Connection Stability (lower is better):
+Download Stability Score: {{stability_download:.2f}}
+Upload Stability Score: {{stability_upload:.2f}}
+
+Latency Under Load (bufferbloat):
+Average Latency While Testing: {{latency_loaded:.1f}} ms
+
+"""
+
+HOUR_TEMPLATE = """
+Hour {hour:02d}:00
+Average Download: {download:.2f} Mbps
+Average Upload: {upload:.2f} Mbps
+Samples taken: {samples}
+"""
+
+def _sample_std(count, total, total_sq):
+    # Sample standard deviation, NaN for a single sample (as pandas).
+    # With integer sums the numerator is exact and never negative.
+    if count < 2:
+        return float('nan')
+    return math.sqrt((count * total_sq - total * total) / (count * (count - 1)))
+
+class SpeedRing:
+    """
+    Rolling window of speed samples with running per-hour statistics.
+
+    Samples live in a structured array that doubles as needed until it holds
+    `window` samples and is then used as a ring, evicting the oldest sample.
+    Speeds are integer bits per second, so the per-hour sums and sums of
+    squares are exact Python ints and removing an evicted sample undoes its
+    addition exactly. They and the loaded-latency sums are updated on every
+    add and evict, so stats() is O(1).
+    """
+    def __init__(self, window=WINDOW_SAMPLES, initial=4096):
+        self.window = window
+        self.n = 0  # samples ever added
+        self._cap = min(initial, window)
+        self._samples = np.zeros(self._cap, dtype=SPEED_DTYPE)
+        # Per hour [count, sum_dl, sum_sq_dl, sum_up, sum_sq_up]
+        self._acc = [[0, 0, 0, 0, 0] for _ in range(24)]
+        # Per hour [sum_loaded_lat, n_loaded_lat]
+        self._lat = [[0.0, 0] for _ in range(24)]
+
+    def __len__(self):
+        return min(self.n, self._cap)
+
+    def add(self, timestamp, hour, download, upload, loaded_lat):
+        """
+        Store a sample and fold it into the hour's statistics.
+        Returns the hour of the evicted sample, or None.
+        """
+        if self.n == self._cap and self._cap < self.window:
+            self._cap = min(self._cap * 2, self.window)
+            grown = np.zeros(self._cap, dtype=SPEED_DTYPE)
+            grown[:self.n] = self._samples
+            self._samples = grown
+        slot = self.n % self._cap
+        evicted_hour = None
+        if self.n >= self._cap:
+            evicted_hour = self._evict(self._samples[slot])
+        self._samples[slot] = (timestamp, hour, download, upload, loaded_lat)
+        self.n += 1
+
+        # Accumulate the stored values so eviction subtracts exactly what was added
+        self._accumulate(self._samples[slot], 1)
+        return evicted_hour
+
+    def _evict(self, sample):
+        self._accumulate(sample, -1)
+        return int(sample['hour'])
+
+    def _accumulate(self, sample, sign):
+        """
+        Add (sign=1) or remove (sign=-1) a stored sample from its hour's sums.
+        """
+        hour = int(sample['hour'])
+        download = int(sample['down_bps'])
+        upload = int(sample['up_bps'])
+        acc = self._acc[hour]
+        acc[0] += sign
+        acc[1] += sign * download
+        acc[2] += sign * download * download
+        acc[3] += sign * upload
+        acc[4] += sign * upload * upload
+
+        lat = self._lat[hour]
+        loaded_lat = float(sample['loaded_lat'])
+        if not math.isnan(loaded_lat):
+            lat[0] += sign * loaded_lat
+            lat[1] += sign
+        # The latency sum is a float; drop any rounding residue once it is empty
+        if not lat[1]:
+            lat[0] = 0.0
+
+    def hours(self):
+        return [hour for hour in range(24) if self._acc[hour][0]]
+
+    def stats(self, hour):
+        """
+        Running statistics for one hour of day, or None if it has no samples.
+        """
+        count, sum_dl, sum_sq_dl, sum_up, sum_sq_up = self._acc[hour]
+        if not count:
+            return None
+        sum_loaded_lat, n_loaded_lat = self._lat[hour]
+        return {
+            'count': count,
+            'download_mean': sum_dl / count,
+            'download_std': _sample_std(count, sum_dl, sum_sq_dl),
+            'upload_mean': sum_up / count,
+            'upload_std': _sample_std(count, sum_up, sum_sq_up),
+            'loaded_lat': sum_loaded_lat / n_loaded_lat if n_loaded_lat else float('nan')
         }
+
+    def take(self, start, stop):
+        """
+        Copy of the samples with absolute indices [start, stop), which may wrap
+        around the end of the ring. Evicted samples are no longer available.
+        """
+        return self._samples[np.arange(start, stop) % self._cap]
+
+class WiFiMonitor:
+    def __init__(self, down_url=CLOUDFLARE_DOWN_URL, up_url=CLOUDFLARE_UP_URL):
+        # Any provider exposing the same sized-download / sink-upload endpoints works
+        self.down_url = down_url
+        self.up_url = up_url
+        # Over HTTP/2 download and upload usually share one connection as
+        # multiplexed streams; the second slot keeps HTTP/1.1 (no h2 installed,
+        # or a provider without HTTP/2) from queueing the upload behind the
+        # download. Waiting for a slot gets its own, shorter timeout.
+        self.client = httpx.AsyncClient(
+            http2=HTTP2,
+            limits=httpx.Limits(max_connections=2),
+            timeout=httpx.Timeout(30.0, pool=5.0)
+        )
+        self.ring = SpeedRing()
+        self._flushed = 0
+        Path(HISTORY_DIR).mkdir(exist_ok=True)
+        self.disconnections = deque(maxlen=MAX_DISCONNECTIONS)
+        self._disconnection_count = 0
+        self._total_downtime = timedelta()
+        self.latency_samples = []
+        self._active_transfers = set()
+        # Indexed by hour of day, None until the hour has a sample (speeds in bps)
+        self.hourly_averages = [None] * 24
+        self._patterns_cache = None
+        self._patterns_n = -1
+        self.max_dl, self.max_dl_ts = 0, None
+        self.min_dl, self.min_dl_ts = float('inf'), None
+        self.max_up, self.max_up_ts = 0, None
+        self.min_up, self.min_up_ts = float('inf'), None
         self.setup_logging()
+        if not HTTP2:
+            logging.warning("h2 not installed, speed tests run over HTTP/1.1")
+        self.reduce_jitter()
+        
+    def reduce_jitter(self):
+        """
+        The monitor owns one core: pin it to a single CPU so latency samples are
+        not skewed by migrations, and make garbage collection rarer and cheaper.
+        """
+        if hasattr(os, 'sched_setaffinity'):  # Linux only
+            try:
+                os.sched_setaffinity(0, {min(os.sched_getaffinity(0))})
+            except OSError as e:
+                logging.warning(f"Could not pin process to a CPU: {str(e)}")
+        gc.set_threshold(50000, 100, 100)
+        # Move everything allocated during setup out of the collector's view
+        gc.freeze()
         
     def setup_logging(self):
+        # Logging calls only enqueue records, the file is written by a listener thread
+        log_queue = queue.SimpleQueue()
+        file_handler = logging.FileHandler('wifi_monitor.log')
+        file_handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+        self._log_listener = logging.handlers.QueueListener(log_queue, file_handler)
+        self._log_listener.start()
+        atexit.register(self._log_listener.stop)
+        # QueueHandler.prepare() bakes its own format into the record, so keep
+        # it to the bare message and let the file handler add the timestamp
         logging.basicConfig(
-            filename='wifi_monitor.log',
             level=logging.INFO,
-            format='%(asctime)s - %(message)s'
+            format='%(message)s',
+            handlers=[logging.handlers.QueueHandler(log_queue)]
         )
+        # httpx logs every request at INFO, keep those out of the monitor log
+        logging.getLogger("httpx").setLevel(logging.WARNING)
     
-    def check_connection(self):
+    async def check_connection(self):
+        """
+        Race TCP probes to both resolvers; connected as soon as one handshake succeeds.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + PROBE_TIMEOUT
+        pending = {asyncio.create_task(asyncio.open_connection(*host)) for host in PROBE_HOSTS}
+        connected = False
         try:
-            socket.create_connection(("8.8.8.8", 53), timeout=3)
-            return True
-        except OSError:
-            return False
+            # A probe can fail fast (e.g. network unreachable), so keep
+            # waiting on the other one until it succeeds or time runs out
+            while pending and not connected:
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=deadline - loop.time(),
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    break
+                for task in done:
+                    if task.exception() is None:
+                        task.result()[1].close()
+                        connected = True
+        finally:
+            for task in pending:
+                task.cancel()
+        return connected
     
-    def measure_speed(self):
+    async def _download(self):
+        received = 0
+        self._active_transfers.add('download')
+        try:
+            async with self.client.stream('GET', self.down_url, params={'bytes': DOWNLOAD_BYTES}) as resp:
+                resp.raise_for_status()
+                # Timed from the response headers, so pool wait and connection setup are excluded
+                start = time.perf_counter()
+                async for chunk in resp.aiter_raw():
+                    received += len(chunk)
+            elapsed = time.perf_counter() - start
+        finally:
+            self._active_transfers.discard('download')
+        return int(received * 8 / elapsed)  # bits per second
+
+    async def _upload(self):
+        start = None
+
+        async def payload():
+            nonlocal start
+            block = bytes(UPLOAD_BLOCK)
+            # The body is only pulled once a connection has been acquired and
+            # the request headers sent, so pool wait stays out of the timing
+            start = time.perf_counter()
+            for _ in range(UPLOAD_BYTES // UPLOAD_BLOCK):
+                yield block
+
+        self._active_transfers.add('upload')
+        try:
+            resp = await self.client.post(self.up_url, content=payload())
+            resp.raise_for_status()
+            elapsed = time.perf_counter() - start
+        finally:
+            self._active_transfers.discard('upload')
+        return int(UPLOAD_BYTES * 8 / elapsed)  # bits per second
+
+    async def _probe_latency(self):
+        """
+        Time a single TCP handshake to PING_HOST, in milliseconds.
+        """
+        start = time.perf_counter()
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(*PING_HOST), timeout=1)
+        except (OSError, asyncio.TimeoutError):
+            return None
+        elapsed = (time.perf_counter() - start) * 1000
+        writer.close()
+        return elapsed
+
+    async def _ping_loop(self, stop_event):
+        """
+        Sample latency at PING_INTERVAL until stop_event is set, keeping the
+        samples taken while a transfer was in flight. Download and upload run
+        concurrently, so these are latencies under the combined load.
+        """
+        while not stop_event.is_set():
+            start = time.perf_counter()
+            rtt = await self._probe_latency()
+            if rtt is not None and self._active_transfers:
+                self.latency_samples.append(rtt)
+            await asyncio.sleep(max(0, PING_INTERVAL - (time.perf_counter() - start)))
+
+    @staticmethod
+    def _latency_stats(samples):
+        if not samples:
+            return float('nan'), float('nan')
+        samples = sorted(samples)
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        return mean(samples), p95
+
+    async def measure_speed(self, timestamp):
         try:
-            st = speedtest.Speedtest()
-            st.get_best_server()
-            download_speed = st.download() / 1_000_000  # Convert to Mbps
-            upload_speed = st.upload() / 1_000_000  # Convert to Mbps
-            self.update_speed_extremes(download_speed, upload_speed)
-            return download_speed, upload_speed
+            # Baseline latency before the link is loaded
+            idle = [await self._probe_latency() for _ in range(IDLE_PINGS)]
+            idle = [rtt for rtt in idle if rtt is not None]
+
+            self.latency_samples.clear()
+            stop_event = asyncio.Event()
+            ping_task = asyncio.create_task(self._ping_loop(stop_event))
+            try:
+                # Run both directions concurrently on the same event loop; if one
+                # fails the TaskGroup cancels the other instead of leaving it running
+                async with asyncio.TaskGroup() as tg:
+                    download = tg.create_task(self._download())
+                    upload = tg.create_task(self._upload())
+                download_speed, upload_speed = download.result(), upload.result()
+            finally:
+                stop_event.set()
+                await ping_task
+
+            idle_mean, idle_p95 = self._latency_stats(idle)
+            loaded_mean, loaded_p95 = self._latency_stats(self.latency_samples)
+            logging.info(
+                f"Latency (mean/p95): idle={idle_mean:.1f}/{idle_p95:.1f} ms, "
+                f"loaded={loaded_mean:.1f}/{loaded_p95:.1f} ms"
+            )
+
+            self.update_speed_extremes(download_speed, upload_speed, timestamp)
+            latency = {'idle': idle_mean, 'loaded': loaded_mean}
+            return download_speed, upload_speed, latency
         except Exception as e:
-            logging.error(f"Speed test failed: {str(e)}")
-            return None, None
+            # TaskGroup failures arrive wrapped in an ExceptionGroup
+            errors = e.exceptions if isinstance(e, ExceptionGroup) else (e,)
+            logging.error(f"Speed test failed: {'; '.join(str(err) for err in errors)}")
+            return None, None, None
     
-    def update_speed_extremes(self, download_speed, upload_speed):
-        current_time = datetime.now()
-        
-        if download_speed > self.speed_extremes['max_download']['speed']:
-            self.speed_extremes['max_download'] = {
-                'speed': download_speed,
-                'timestamp': current_time
-            }
-        if download_speed < self.speed_extremes['min_download']['speed']:
-            self.speed_extremes['min_download'] = {
-                'speed': download_speed,
-                'timestamp': current_time
-            }
+    def update_speed_extremes(self, download_speed, upload_speed, timestamp):
+        if download_speed > self.max_dl:
+            self.max_dl, self.max_dl_ts = download_speed, timestamp
+        if download_speed < self.min_dl:
+            self.min_dl, self.min_dl_ts = download_speed, timestamp
             
-        if upload_speed > self.speed_extremes['max_upload']['speed']:
-            self.speed_extremes['max_upload'] = {
-                'speed': upload_speed,
-                'timestamp': current_time
-            }
-        if upload_speed < self.speed_extremes['min_upload']['speed']:
-            self.speed_extremes['min_upload'] = {
-                'speed': upload_speed,
-                'timestamp': current_time
-            }
+        if upload_speed > self.max_up:
+            self.max_up, self.max_up_ts = upload_speed, timestamp
+        if upload_speed < self.min_up:
+            self.min_up, self.min_up_ts = upload_speed, timestamp
     
-    def track_disconnection(self, start_time):
-        while not self.check_connection():
-            time.sleep(5)  # Check every 5 seconds
+    @staticmethod
+    def _open_netlink():
+        """
+        Subscribe to kernel link/address/route notifications on a raw rtnetlink
+        socket, or None if unavailable (not Linux, or the socket can't be opened).
+        """
+        if not hasattr(socket, 'AF_NETLINK'):
+            return None
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+        except OSError:
+            return None
+        try:
+            sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV4_ROUTE))
+            # Drained from the event loop, reads must never block
+            sock.setblocking(False)
+        except OSError:
+            sock.close()
+            return None
+        return sock
+
+    @staticmethod
+    def _drain_netlink(fd, link_event):
+        """
+        Reader callback: discard every pending notification so the level-triggered
+        reader stops firing, then wake the reconnect wait.
+        """
+        try:
+            while os.read(fd, 65536):
+                pass
+        except OSError:  # BlockingIOError once empty, or ENOBUFS on overrun
+            pass
+        link_event.set()
+
+    async def track_disconnection(self, start_time):
+        loop = asyncio.get_running_loop()
+        link_event = asyncio.Event()
+        netlink = self._open_netlink()
+        if netlink is not None:
+            loop.add_reader(netlink.fileno(), self._drain_netlink, netlink.fileno(), link_event)
+        delay = RECONNECT_BACKOFF_MIN
+        try:
+            while not await self.check_connection():
+                # Re-probe as soon as the kernel reports a network change, or
+                # when the backoff expires (connectivity can also come back upstream)
+                try:
+                    await asyncio.wait_for(link_event.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    delay = min(delay * 2, RECONNECT_BACKOFF_MAX)
+                else:
+                    link_event.clear()
+        finally:
+            if netlink is not None:
+                loop.remove_reader(netlink.fileno())
+                netlink.close()
         end_time = datetime.now()
         duration = end_time - start_time
+        # Materialize the display strings once instead of on every report
         self.disconnections.append({
-            'start': start_time,
-            'end': end_time,
-            'duration': duration
+            'start': start_time.isoformat(timespec='seconds'),
+            'end': end_time.isoformat(timespec='seconds'),
+            'duration_s': duration.total_seconds()
         })
+        self._disconnection_count += 1
+        self._total_downtime += duration
         logging.info(f"Connection restored after {duration}")
 
+    def _append_speed(self, timestamp, hour, download, upload, loaded_lat):
+        evicted_hour = self.ring.add(timestamp, hour, download, upload, loaded_lat)
+        self._refresh_hourly_average(hour)
+        if evicted_hour is not None and evicted_hour != hour:
+            self._refresh_hourly_average(evicted_hour)
+        if self.ring.n - self._flushed >= FLUSH_EVERY:
+            self.flush_history()
+
+    def _refresh_hourly_average(self, hour):
+        stats = self.ring.stats(hour)
+        if stats is None:
+            self.hourly_averages[hour] = None
+            return
+        self.hourly_averages[hour] = {
+            'download': stats['download_mean'],
+            'upload': stats['upload_mean'],
+            'samples': stats['count']
+        }
+
+    def flush_history(self):
+        """
+        Write the samples not yet on disk as a new file in the Parquet history,
+        named after its first sample's timestamp. Read the whole history with
+        pq.read_table(HISTORY_DIR).
+        """
+        if self._flushed == self.ring.n:
+            return
+        staged = self.ring.take(self._flushed, self.ring.n)
+        table = pa.Table.from_arrays(
+            # Fields of a structured array are strided views, copy them out contiguously
+            [pa.array(np.ascontiguousarray(staged[field.name]), type=field.type) for field in HISTORY_SCHEMA],
+            schema=HISTORY_SCHEMA
+        )
+        pq.write_table(table, Path(HISTORY_DIR) / f"{staged['ts'][0]}.parquet", compression='zstd')
+        self._flushed = self.ring.n
+
     def analyze_patterns(self):
-        if not self.speeds:
+        # Reuse the last result until a new sample is appended
+        if self._patterns_n == self.ring.n:
+            return self._patterns_cache
+
+        self._patterns_cache = self._compute_patterns()
+        self._patterns_n = self.ring.n
+        return self._patterns_cache
+
+    def _compute_patterns(self):
+        if not len(self.ring):
             return None
 
-        # Convert speeds to pandas DataFrame for analysis
-        df = pd.DataFrame(self.speeds)
-        
-        # Analyze hourly patterns
-        hourly_patterns = df.groupby(df['timestamp'].dt.hour).agg({
-            'download': ['mean', 'std'],
-            'upload': ['mean', 'std']
-        })
+        # Build hourly patterns from the ring's running per-hour statistics
+        hours = self.ring.hours()
+        columns = defaultdict(list)
+        for hour in hours:
+            stats = self.ring.stats(hour)
+            columns['download', 'mean'].append(stats['download_mean'])
+            columns['download', 'std'].append(stats['download_std'])
+            columns['upload', 'mean'].append(stats['upload_mean'])
+            columns['upload', 'std'].append(stats['upload_std'])
+            columns['loaded_lat', 'mean'].append(stats['loaded_lat'])
+        hourly_patterns = pd.DataFrame(columns, index=hours)
         
         # Identify peak and low usage hours
         peak_hours = {
@@ -116,149 +590,152 @@ class WiFiMonitor:
             'upload': hourly_patterns['upload']['std'].mean()
         }
         
+        # Average latency while the link is saturated (bufferbloat)
+        loaded_latency = hourly_patterns['loaded_lat']['mean'].mean()
+        
         return {
             'peak_hours': peak_hours,
             'low_hours': low_hours,
             'stability': stability,
+            'loaded_latency': loaded_latency,
             'hourly_patterns': hourly_patterns
         }
 
+    @staticmethod
+    def _format_ts(timestamp):
+        # Sample times are kept as epoch nanoseconds, format them only for output
+        if timestamp is None:
+            return None
+        return datetime.fromtimestamp(timestamp / NS_PER_S)
+
     def calculate_total_downtime(self):
-        total_duration = timedelta()
-        for d in self.disconnections:
-            total_duration += d['duration']
-        return total_duration
+        # Kept as a running total so it still covers disconnections evicted from the deque
+        return self._total_downtime
     
     def generate_report(self, filename="wifi_report.txt"):
         patterns = self.analyze_patterns()
         total_downtime = self.calculate_total_downtime()
         
-        # Create report content
-        report_content = []
-        
-        # Add report header
-        report_content.append("=" * 30 + " WiFi Monitoring Report " + "=" * 30)
-        report_content.append(f"Report generated at: {datetime.now()}\n")
+        buf = io.StringIO()
         
-        # Speed Extremes Section
-        report_content.append("=" * 30 + " Speed Extremes " + "=" * 30)
-        report_content.append(f"Maximum Download: {self.speed_extremes['max_download']['speed']:.2f} Mbps " +
-                               f"at {self.speed_extremes['max_download']['timestamp']}")
-        report_content.append(f"Minimum Download: {self.speed_extremes['min_download']['speed']:.2f} Mbps " +
-                               f"at {self.speed_extremes['min_download']['timestamp']}")
-        report_content.append(f"Maximum Upload: {self.speed_extremes['max_upload']['speed']:.2f} Mbps " +
-                               f"at {self.speed_extremes['max_upload']['timestamp']}")
-        report_content.append(f"Minimum Upload: {self.speed_extremes['min_upload']['speed']:.2f} Mbps " +
-                               f"at {self.speed_extremes['min_upload']['timestamp']}\n")
-        
-        # Connection Issues Section
-        report_content.append("=" * 30 + " Connection Summary " + "=" * 30)
-        report_content.append(f"Total Disconnection Time: {total_downtime}")
-        report_content.append(f"Number of Disconnections: {len(self.disconnections)}\n")
+        # Header, speed extremes and connection summary
+        buf.write(REPORT_TEMPLATE.format(
+            generated_at=datetime.now(),
+            max_dl=self.max_dl / BPS_PER_MBPS,
+            max_dl_ts=self._format_ts(self.max_dl_ts),
+            min_dl=self.min_dl / BPS_PER_MBPS,
+            min_dl_ts=self._format_ts(self.min_dl_ts),
+            max_up=self.max_up / BPS_PER_MBPS,
+            max_up_ts=self._format_ts(self.max_up_ts),
+            min_up=self.min_up / BPS_PER_MBPS,
+            min_up_ts=self._format_ts(self.min_up_ts),
+            total_downtime=total_downtime,
+            disconnections=self._disconnection_count
+        ))
         
         # Detailed Disconnections
-        report_content.append("=" * 30 + " Detailed Disconnections " + "=" * 30)
         if self.disconnections:
             for d in self.disconnections:
-                report_content.append(f"Disconnected at: {d['start']}")
-                report_content.append(f"Reconnected at: {d['end']}")
-                report_content.append(f"Duration: {d['duration']}\n")
+                buf.write(DISCONNECTION_TEMPLATE.format_map(d))
         else:
-            report_content.append("No disconnections recorded\n")
+            buf.write(NO_DISCONNECTIONS)
         
         # Pattern Analysis
         if patterns:
-            report_content.append("=" * 30 + " Speed Patterns " + "=" * 30)
-            report_content.append(f"Peak Download Speed Hour: {patterns['peak_hours']['download']:02d}:00")
-            report_content.append(f"Peak Upload Speed Hour: {patterns['peak_hours']['upload']:02d}:00")
-            report_content.append(f"Lowest Download Speed Hour: {patterns['low_hours']['download']:02d}:00")
-            report_content.append(f"Lowest Upload Speed Hour: {patterns['low_hours']['upload']:02d}:00")
-            report_content.append("\nConnection Stability (lower is better):")
-            report_content.append(f"Download Stability Score: {patterns['stability']['download']:.2f}")
-            report_content.append(f"Upload Stability Score: {patterns['stability']['upload']:.2f}\n")
+            buf.write(PATTERNS_TEMPLATE.format(
+                peak_download=patterns['peak_hours']['download'],
+                peak_upload=patterns['peak_hours']['upload'],
+                low_download=patterns['low_hours']['download'],
+                low_upload=patterns['low_hours']['upload'],
+                stability_download=patterns['stability']['download'] / BPS_PER_MBPS,
+                stability_upload=patterns['stability']['upload'] / BPS_PER_MBPS,
+                latency_loaded=patterns['loaded_latency']
+            ))
         
         # Hourly Averages
-        report_content.append("=" * 30 + " Hourly Speed Averages " + "=" * 30)
-        for hour, data in sorted(self.hourly_averages.items()):
-            report_content.append(f"\nHour {hour:02d}:00")
-            report_content.append(f"Average Download: {data['download']:.2f} Mbps")
-            report_content.append(f"Average Upload: {data['upload']:.2f} Mbps")
-            report_content.append(f"Samples taken: {data['samples']}")
+        buf.write(HDR_HOURLY)
+        buf.write("\n")
+        for hour in range(24):
+            data = self.hourly_averages[hour]
+            if data is None:
+                continue
+            buf.write(HOUR_TEMPLATE.format(
+                hour=hour,
+                download=data['download'] / BPS_PER_MBPS,
+                upload=data['upload'] / BPS_PER_MBPS,
+                samples=data['samples']
+            ))
+        
+        report = buf.getvalue()
         
         # Print report to terminal
-        print("\n".join(report_content))
+        print(report, end="")
         
         # Write report to file
-        with open(filename, 'w') as f:
-            f.write("\n".join(report_content))
+        Path(filename).write_text(report)
         
         logging.info("Report generated and saved to " + filename)
 
-    def calculate_hourly_average(self):
-        """
-        Calculate average speeds for the current hour and store in hourly_averages.
-        """
-        if not self.speeds:
-            return
-
-        # Filter speeds for the current hour
-        hour_speeds = [
-            speed for speed in self.speeds 
-            if speed['hour'] == self.current_hour
-        ]
-
-        if not hour_speeds:
-            return
-
-        # Calculate averages
-        download_speeds = [speed['download'] for speed in hour_speeds]
-        upload_speeds = [speed['upload'] for speed in hour_speeds]
-
-        self.hourly_averages[self.current_hour] = {
-            'download': mean(download_speeds),
-            'upload': mean(upload_speeds),
-            'samples': len(hour_speeds)
-        }
-        
     def run(self, duration_hours=1/6):
-        start_time = datetime.now()
-        end_time = start_time + timedelta(hours=duration_hours)
+        asyncio.run(self._run_async(duration_hours))
+
+    async def _run_async(self, duration_hours):
+        # Samples are scheduled on an absolute grid (start + k * SAMPLE_INTERVAL_NS)
+        # so slow speed tests don't push later samples back
+        tick = time.time_ns()
+        end_tick = tick + int(duration_hours * 3600 * NS_PER_S)
+        start_time = datetime.fromtimestamp(tick / NS_PER_S)
         
         logging.info(f"Starting WiFi monitoring at {start_time}")
         
-        while datetime.now() < end_time:
-            current_time = datetime.now()
-            
-            # Check if hour has changed
-            if current_time.hour != self.current_hour:
-                self.calculate_hourly_average()
-                self.current_hour = current_time.hour
+        try:
+            await self._monitor(tick, end_tick)
+        finally:
+            # Write out the last partial batch
+            self.flush_history()
+            await self.client.aclose()
+        
+        # Generate final report
+        self.generate_report()
+        logging.info("Monitoring completed. Report generated.")
+
+    async def _monitor(self, tick, end_tick):
+        while tick < end_tick:
+            # The scheduled tick is this iteration's only clock reading
+            hour = time.localtime(tick // NS_PER_S).tm_hour
             
             # Check connection
-            if not self.check_connection():
+            if not await self.check_connection():
                 disconnect_time = datetime.now()
                 logging.warning(f"Connection lost at {disconnect_time}")
-                self.track_disconnection(disconnect_time)
-                continue
+                await self.track_disconnection(disconnect_time)
+            else:
+                await self._sample(tick, hour)
             
-            # Measure speed
-            download_speed, upload_speed = self.measure_speed()
-            if download_speed and upload_speed:
-                self.speeds.append({
-                    'timestamp': current_time,
-                    'hour': current_time.hour,
-                    'download': download_speed,
-                    'upload': upload_speed
-                })
-                logging.info(f"Speed test: Download={download_speed:.2f} Mbps, Upload={upload_speed:.2f} Mbps")
-            
-            # Wait for the next measurement
-            time.sleep(60)  # Test every minute
-        
-        # Generate final report
-        self.calculate_hourly_average()  # Calculate average for the last hour
-        self.generate_report()
-        logging.info("Monitoring completed. Report generated.")
+            # Wait for the next tick, coalescing any that were missed
+            tick += SAMPLE_INTERVAL_NS
+            now = time.time_ns()
+            if tick < now:
+                missed = (now - tick + SAMPLE_INTERVAL_NS - 1) // SAMPLE_INTERVAL_NS
+                tick += missed * SAMPLE_INTERVAL_NS
+            if tick < end_tick:
+                await asyncio.sleep((tick - now) / NS_PER_S)
+
+    async def _sample(self, timestamp, hour):
+        # Measure speed
+        download_speed, upload_speed, latency = await self.measure_speed(timestamp)
+        if download_speed and upload_speed:
+            self._append_speed(
+                timestamp,
+                hour,
+                download_speed,
+                upload_speed,
+                latency['loaded']
+            )
+            logging.info(
+                f"Speed test: Download={download_speed / BPS_PER_MBPS:.2f} Mbps, "
+                f"Upload={upload_speed / BPS_PER_MBPS:.2f} Mbps"
+            )
 
 if __name__ == "__main__":
     monitor = WiFiMonitor()